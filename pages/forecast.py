@@ -1,41 +1,364 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from datetime import datetime, timedelta
+from datetime import datetime
+import importlib
 import io
+import os
+import sys
 import numpy as np
 from utils.auth import require_auth
 from utils.database import MongoDBConnection
+from pymongo import ReadPreference
+
+# Add scripts directory to path once, using relative path from current file
+SCRIPTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts')
+if SCRIPTS_DIR not in sys.path:
+    sys.path.insert(0, SCRIPTS_DIR)
+
+@st.cache_resource
+def get_forecast_module():
+    """Import the forecast script on first use and reuse the module afterwards"""
+    return importlib.import_module('forecast_inventory')
+
+@st.cache_resource
+def get_db():
+    """Get a long-lived database handle shared across reruns and sessions"""
+    return MongoDBConnection.get_database()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def has_items():
+    """Check whether any item exists, for the empty-forecast fallback"""
+    db = get_db()
+    # Collection metadata answers this without reading any document
+    return db['items'].estimated_document_count() > 0
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_forecast_data():
+    """Load the latest forecast run merged with current item details, plus its
+    summary metrics"""
+    db = get_db()
+    
+    # The forecast is a snapshot of the last run, so a secondary's copy is
+    # acceptable; primaryPreferred keeps the page readable during a failover
+    # while still reading the primary whenever one is available
+    forecast_collection = db.get_collection('inventory_forecast', read_preference=ReadPreference.PRIMARY_PREFERRED)
+    
+    # Latest run date from the (forecast_date, months_to_min_stock) index
+    latest = forecast_collection.find_one({}, {'forecast_date': 1}, sort=[('forecast_date', -1)])
+    if latest is None:
+        return pd.DataFrame(), {'total': 0, 'reorder3': 0, 'avg_conf': 0, 'high_conf': 0}
+    
+    pipeline = [
+        # Every row of the latest run, already in reorder order by the index
+        {"$match": {"forecast_date": latest['forecast_date']}},
+        {"$sort": {"months_to_min_stock": 1}},
+        {
+            "$lookup": {
+                "from": "items",
+                "localField": "item_id",
+                "foreignField": "_id",
+                "as": "item"
+            }
+        },
+        {"$unwind": "$item"},
+        {
+            "$project": {
+                # Only the fields the tables and charts below actually read;
+                # numeric fields arrive as doubles so pandas needs no coercion
+                "_id": 0,
+                "item_name": "$item.name",
+                "category": "$item.category",
+                "current_stock": "$item.current_stock",
+                "min_stock": "$item.min_stock",
+                "unit": "$item.unit",
+                "annual_consumption_rate": {"$convert": {"input": "$annual_consumption_rate", "to": "double", "onError": 0, "onNull": 0}},
+                "projected_annual_consumption": {"$convert": {"input": "$projected_annual_consumption", "to": "double", "onError": 0, "onNull": 0}},
+                "months_to_min_stock": {"$convert": {"input": "$months_to_min_stock", "to": "double", "onError": 0, "onNull": 0}},
+                "reorder_date": {"$dateToString": {"format": "%d/%m/%Y", "date": "$reorder_date", "onNull": None}},
+                "recommended_order_qty": {"$ifNull": ["$recommended_order_qty", 0]},
+                "confidence_level": {"$convert": {"input": "$confidence_level", "to": "double", "onError": 0, "onNull": 0}},
+                "forecast_method": {"$ifNull": ["$forecast_method", ""]},
+                "forecast_date": 1
+            }
+        }
+    ]
+    
+    # Rows stream back through a cursor, so the run size is not bounded by
+    # the 16 MB limit of a single result document
+    forecast_data = pd.DataFrame(list(forecast_collection.aggregate(pipeline)))
+    if forecast_data.empty:
+        return forecast_data, {'total': 0, 'reorder3': 0, 'avg_conf': 0, 'high_conf': 0}
+    
+    # Summary metrics come from the columns already loaded, in one pass each
+    months_to_min = forecast_data['months_to_min_stock'].to_numpy()
+    confidence = forecast_data['confidence_level'].to_numpy()
+    summary = {
+        'total': len(forecast_data),
+        'reorder3': int((months_to_min <= 3).sum()),
+        'avg_conf': float(confidence.mean()),
+        'high_conf': int((confidence >= 0.7).sum())
+    }
+    
+    return forecast_data, summary
+
+def clear_forecast_cache():
+    """Drop cached forecast reads so the next rerun sees a fresh forecast run"""
+    has_items.clear()
+    load_forecast_data.clear()
+    build_chart.clear()
+
+# Render confidence client-side as a 0-100 progress bar; the numeric column
+# needs no per-cell Styler pass and the frontend adds the percent sign
+CONFIDENCE_COLUMN_CONFIG = {
+    'confidence_level_pct': st.column_config.ProgressColumn('Confidence', format='%.1f%%', min_value=0, max_value=100)
+}
+
+def build_csv(df):
+    """Serialize a forecast table to CSV bytes with Arrow's C++ writer"""
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+    
+    # An Arrow-native buffer avoids calling back into Python for every write
+    output = pa.BufferOutputStream()
+    pacsv.write_csv(pa.Table.from_pandas(df, preserve_index=False), output)
+    return output.getvalue().to_pybytes()
+
+def build_excel(df):
+    """Write a forecast table to an in-memory xlsx file, streaming rows to disk"""
+    output = io.BytesIO()
+    # constant_memory flushes each row once written, so cells have to arrive
+    # in row order: header first, then one write_row per record
+    with pd.ExcelWriter(output, engine='xlsxwriter', engine_kwargs={'options': {'constant_memory': True, 'nan_inf_to_errors': True}}) as writer:
+        workbook = writer.book
+        worksheet = workbook.add_worksheet('Prediksi')
+        
+        # Add header format
+        header_format = workbook.add_format({
+            'bold': True,
+            'text_wrap': True,
+            'valign': 'top',
+            'bg_color': '#D7E4BC',
+            'border': 1
+        })
+        worksheet.write_row(0, 0, df.columns, header_format)
+        
+        # Size each column to its longest value or header
+        for col_num, col in enumerate(df.columns):
+            width = max(df[col].astype(str).str.len().max(), len(col)) + 2
+            worksheet.set_column(col_num, col_num, min(width, 50))
+        
+        # DataFrame.to_excel fills the sheet column by column, which would
+        # drop every cell after the first column of flushed rows
+        for row_num, row in enumerate(df.itertuples(index=False, name=None), start=1):
+            worksheet.write_row(row_num, 0, row)
+    
+    return output.getvalue()
+
+@st.cache_data(ttl=600, show_spinner=False)
+def build_chart(chart_type, chart_data=None, **chart_kwargs):
+    """Build a Plotly Express chart once per input and cache its figure spec"""
+    # The plotted slice is part of the cache key, so item names or categories
+    # refreshed by the loader never pair with a stale chart
+    # Plotly is slow to import; pages that stop before charting never pay for it
+    import plotly.express as px
+    
+    fig = getattr(px, chart_type)(chart_data, **chart_kwargs)
+    return fig.to_dict()
+
+# Fragments rerun only their own body on interaction; older Streamlit
+# releases without them fall back to rendering as a plain function
+fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None) or (lambda func: func)
+
+@fragment
+def show_data_table(display_df):
+    """Render the forecast table with its export options"""
+    st.dataframe(display_df, column_config=CONFIDENCE_COLUMN_CONFIG, use_container_width=True)
+    
+    # Export options
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if st.button("Ekspor ke CSV"):
+            csv = build_csv(display_df)
+            st.download_button(
+                label="Download CSV",
+                data=csv,
+                file_name=f"inventory_forecast_{st.session_state['export_ts']}.csv",
+                mime="text/csv"
+            )
+    
+    with col2:
+        if st.button("Ekspor ke Excel"):
+            excel_data = build_excel(display_df)
+            
+            st.download_button(
+                label="Download Excel",
+                data=excel_data,
+                file_name=f"inventory_forecast_{st.session_state['export_ts']}.xlsx",
+                mime="application/vnd.ms-excel"
+            )
+
+@fragment
+def show_consumption_charts(forecast_display):
+    """Render the top-15 consumption charts"""
+    # Top 15 by projected consumption (bounded heap, no full sort)
+    consumption_chart = forecast_display.nlargest(15, 'projected_annual_consumption')
+    
+    # Ensure data is clean and valid
+    consumption_chart = consumption_chart.dropna(subset=['projected_annual_consumption', 'item_name'])
+    if len(consumption_chart) > 0:
+        fig = build_chart(
+            'bar',
+            consumption_chart[['item_name', 'projected_annual_consumption', 'category']], 
+            x='item_name', 
+            y='projected_annual_consumption',
+            title='15 Item dengan Proyeksi Konsumsi Tertinggi',
+            labels={'item_name': 'Nama Item', 'projected_annual_consumption': 'Proyeksi Konsumsi Tahunan (%)'},
+            color='category'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    else:
+        st.info("Tidak cukup data untuk menampilkan grafik proyeksi konsumsi")
+    
+    # Show consumption rate - handle potential empty data
+    rate_data = forecast_display.nlargest(15, 'annual_consumption_rate')
+    if len(rate_data) > 0:
+        # Ensure data is clean and valid
+        rate_data = rate_data.dropna(subset=['annual_consumption_rate', 'item_name'])
+        if len(rate_data) > 0:
+            fig2 = build_chart(
+                'bar',
+                rate_data[['item_name', 'annual_consumption_rate', 'category']], 
+                x='item_name', 
+                y='annual_consumption_rate',
+                title='15 Item dengan Tingkat Konsumsi Tertinggi',
+                labels={'item_name': 'Nama Item', 'annual_consumption_rate': 'Tingkat Konsumsi Tahunan (%)'},
+                color='category'
+            )
+            st.plotly_chart(fig2, use_container_width=True)
+        else:
+            st.info("Tidak cukup data yang valid untuk menampilkan grafik")
+    else:
+        st.info("Tidak cukup data untuk menampilkan grafik tingkat konsumsi")
+
+@fragment
+def show_reorder_charts(forecast_display):
+    """Render the top-15 reorder timing charts"""
+    # 15 items closest to minimum stock (bounded heap, no full sort)
+    reorder_chart = forecast_display.nsmallest(15, 'months_to_min_stock')
+    
+    # Ensure data is clean and valid
+    reorder_chart = reorder_chart.dropna(subset=['months_to_min_stock', 'item_name'])
+    if len(reorder_chart) > 0:
+        fig = build_chart(
+            'bar',
+            reorder_chart[['item_name', 'months_to_min_stock']], 
+            x='item_name', 
+            y='months_to_min_stock',
+            title='15 Item dengan Waktu Pemesanan Terdekat',
+            labels={'item_name': 'Nama Item', 'months_to_min_stock': 'Bulan Hingga Stok Minimum'},
+            color='months_to_min_stock',
+            color_continuous_scale='RdYlGn'
+        )
+        st.plotly_chart(fig, use_container_width=True)
+    
+        # Show recommended order quantities
+        fig2 = build_chart(
+            'bar',
+            reorder_chart[['item_name', 'recommended_order_qty', 'category']], 
+            x='item_name', 
+            y='recommended_order_qty',
+            title='Jumlah Pemesanan yang Direkomendasikan',
+            labels={'item_name': 'Nama Item', 'recommended_order_qty': 'Jumlah Pemesanan'},
+            color='category'
+        )
+        st.plotly_chart(fig2, use_container_width=True)
+    else:
+        st.info("Tidak cukup data untuk menampilkan grafik waktu pemesanan")
+
+@fragment
+def show_quality_analysis(forecast_display):
+    """Render the forecast quality analysis"""
+    st.subheader("Analisis Kualitas Prediksi")
+    
+    # Ensure we have the forecast_method column
+    if 'forecast_method' not in forecast_display.columns:
+        forecast_display['forecast_method'] = 'Seasonal Average'
+    
+    # Pull the confidence column once; the histogram and both masks reuse it
+    confidence_pct = forecast_display['confidence_level_pct'].to_numpy()
+    
+    # Confidence level distribution
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        if len(forecast_display) > 0:
+            # One C-level pass over fixed 20-point buckets
+            confidence_counts, _ = np.histogram(confidence_pct, bins=[0, 20, 40, 60, 80, 100])
+            fig_conf = build_chart(
+                'bar',
+                x=['Rendah', 'Cukup', 'Sedang', 'Tinggi', 'Sangat Tinggi'],
+                y=confidence_counts.tolist(),
+                title="Distribusi Tingkat Kepercayaan Prediksi",
+                labels={'x': 'Tingkat Kepercayaan', 'y': 'Jumlah Item'}
+            )
+            st.plotly_chart(fig_conf, use_container_width=True)
+    
+    with col2:
+        method_counts = forecast_display['forecast_method'].value_counts()
+        # Cap the pie at the 8 most used methods and fold the tail into "Lainnya"
+        if len(method_counts) > 8:
+            method_counts = pd.concat([
+                method_counts.iloc[:8],
+                pd.Series({'Lainnya': method_counts.iloc[8:].sum()})
+            ])
+        if len(method_counts) > 0:
+            fig_method = build_chart(
+                'pie',
+                values=method_counts.tolist(),
+                names=method_counts.index.tolist(),
+                title="Metode Prediksi yang Digunakan"
+            )
+            st.plotly_chart(fig_method, use_container_width=True)
+    
+    # Show items with low confidence
+    low_confidence = forecast_display[confidence_pct < 50]
+    if len(low_confidence) > 0:
+        st.warning("⚠️ Item dengan Prediksi Rendah (< 50% kepercayaan)")
+        low_conf_cols = ['item_name', 'category', 'current_stock', 'months_to_min_stock', 'confidence_level_pct', 'forecast_method']
+        st.dataframe(low_confidence[low_conf_cols], column_config=CONFIDENCE_COLUMN_CONFIG)
+    
+    # Show high confidence predictions
+    high_confidence = forecast_display[confidence_pct >= 80]
+    if len(high_confidence) > 0:
+        st.success("✅ Item dengan Prediksi Tinggi (≥ 80% kepercayaan)")
+        high_conf_cols = ['item_name', 'category', 'current_stock', 'months_to_min_stock', 'recommended_order_qty', 'confidence_level_pct']
+        st.dataframe(high_confidence[high_conf_cols], column_config=CONFIDENCE_COLUMN_CONFIG)
 
 def app():
     require_auth()
     
     st.title("Prediksi Kebutuhan Inventaris")
     
-    # Get forecast data
-    db = MongoDBConnection.get_database()
-    items_collection = db['items']
-    items_data = list(items_collection.find({}, {'_id': 1, 'name': 1, 'category': 1, 'current_stock': 1, 'min_stock': 1, 'unit': 1}).sort([('category', 1), ('name', 1)]))
-    df = pd.DataFrame(items_data)
+    # Get forecast data for the latest run
+    forecast_data, summary = load_forecast_data()
     
     # Check if forecast data exists
-    forecast_collection = db['inventory_forecast']
-    forecast_exists = forecast_collection.find_one() is not None
-    
-    if not forecast_exists:
+    if forecast_data.empty:
         st.warning("Belum ada data prediksi. Silakan jalankan proses prediksi terlebih dahulu.")
         
+        # Show whether items exist so the user knows a forecast can be built
+        if has_items():
+            st.info("Data item tersedia. Klik tombol 'Jalankan Prediksi' untuk membuat data prediksi.")
+        else:
+            st.error("Tidak ada data item. Silakan tambahkan data item terlebih dahulu.")
+        
         if st.button("Jalankan Prediksi"):
             st.info("Memulai proses prediksi...")
             try:
-                # Import and run the forecast script
-                import sys
-                import os
-                # Add scripts directory to path using relative path from current file
-                current_dir = os.path.dirname(os.path.abspath(__file__))
-                scripts_dir = os.path.join(current_dir, '..', 'scripts')
-                sys.path.append(scripts_dir)
-                import forecast_inventory
+                # Run the forecast through the cached module
+                get_forecast_module().run_forecast()
+                clear_forecast_cache()
                 st.success("Prediksi berhasil dijalankan!")
                 st.rerun()
             except Exception as e:
@@ -43,10 +366,13 @@ def app():
         
         st.stop()
     
-    # Get the latest forecast date
-    forecast_collection = db['inventory_forecast']
-    latest_forecast_doc = forecast_collection.find_one(sort=[('forecast_date', -1)])
-    latest_forecast = latest_forecast_doc['forecast_date'] if latest_forecast_doc else None
+    latest_forecast = forecast_data.pop('forecast_date').iloc[0]
+    
+    # Stamp export file names once per forecast run so the download widgets
+    # keep the same identity across reruns
+    if st.session_state.get('export_forecast') != latest_forecast:
+        st.session_state['export_forecast'] = latest_forecast
+        st.session_state['export_ts'] = datetime.now().strftime('%Y%m%d_%H%M%S')
     
     # Create columns for forecast info and refresh button
     col_info, col_refresh = st.columns([3, 1])
@@ -55,20 +381,16 @@ def app():
         st.info(f"Data prediksi terakhir: {latest_forecast}")
     
     with col_refresh:
-        if st.button("🔄 Jalankan Prediksi Baru", type="primary"):
+        # A form only reruns the script on submit, not on every widget change
+        with st.form('refresh_form'):
+            submitted = st.form_submit_button("🔄 Jalankan Prediksi Baru", type="primary")
+        
+        if submitted:
             with st.spinner("Menjalankan prediksi baru..."):
                 try:
-                    # Import and run the forecast script
-                    import sys
-                    import os
-                    # Add scripts directory to path using relative path from current file
-                    current_dir = os.path.dirname(os.path.abspath(__file__))
-                    scripts_dir = os.path.join(current_dir, '..', 'scripts')
-                    sys.path.append(scripts_dir)
-                    
-                    # Run the forecast
-                    import forecast_inventory
-                    forecast_inventory.run_forecast()
+                    # Run the forecast through the cached module
+                    get_forecast_module().run_forecast()
+                    clear_forecast_cache()
                     
                     st.success("Prediksi baru berhasil dijalankan!")
                     st.rerun()
@@ -76,96 +398,41 @@ def app():
                     st.error(f"Error saat menjalankan prediksi: {e}")
                     st.info("Silakan cek koneksi database dan pastikan data transaksi tersedia.")
 
-    # Get forecast data with MongoDB aggregation
-    forecast_collection = db['inventory_forecast']
-    items_collection = db['items']
-    
-    # Get latest forecast date
-    latest_forecast_doc = forecast_collection.find_one(sort=[('forecast_date', -1)])
-    if latest_forecast_doc:
-        latest_forecast_date = latest_forecast_doc['forecast_date']
-        
-        # Get forecast data with item details
-        forecast_data = list(forecast_collection.find({'forecast_date': latest_forecast_date}))
-        
-        # Get item details and merge data
-        forecast_list = []
-        for forecast in forecast_data:
-            item = items_collection.find_one({'_id': forecast['item_id']})
-            if item:
-                forecast_list.append({
-                    'id': str(forecast['_id']),
-                    'item_id': str(forecast['item_id']),
-                    'item_name': item['name'],
-                    'category': item['category'],
-                    'current_stock': item['current_stock'],
-                    'min_stock': item['min_stock'],
-                    'unit': item['unit'],
-                    'annual_consumption_rate': forecast.get('annual_consumption_rate', 0),
-                    'projected_annual_consumption': forecast.get('projected_annual_consumption', 0),
-                    'monthly_projected_consumption': forecast.get('monthly_projected_consumption', 0),
-                    'months_to_min_stock': forecast.get('months_to_min_stock', 0),
-                    'reorder_date': forecast.get('reorder_date'),
-                    'recommended_order_qty': forecast.get('recommended_order_qty', 0),
-                    'confidence_level': forecast.get('confidence_level', 0),
-                    'forecast_method': forecast.get('forecast_method', '')
-                })
-        
-        forecast_data = pd.DataFrame(forecast_list).sort_values('months_to_min_stock')
-    else:
-        forecast_data = pd.DataFrame()
-    
-    # Check if forecast data is empty
-    if forecast_data.empty:
-        st.warning("Belum ada data prediksi. Silakan jalankan prediksi terlebih dahulu.")
-        
-        # Show items table to verify data exists
-        items_data = pd.DataFrame(items_data)
-        if not items_data.empty:
-            st.info("Data item tersedia. Klik tombol 'Jalankan Prediksi' untuk membuat data prediksi.")
-        else:
-            st.error("Tidak ada data item. Silakan tambahkan data item terlebih dahulu.")
-        
-        return
-    
     # Display summary
     st.subheader("Ringkasan Prediksi")
     
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Item", len(forecast_data))
+        st.metric("Total Item", summary['total'])
     
     with col2:
-        items_to_reorder = len(forecast_data[forecast_data['months_to_min_stock'] <= 3])
-        st.metric("Perlu Dipesan (3 Bulan)", items_to_reorder)
+        st.metric("Perlu Dipesan (3 Bulan)", summary['reorder3'])
     
     with col3:
-        avg_confidence = forecast_data['confidence_level'].mean() * 100
+        avg_confidence = summary['avg_conf'] * 100
         st.metric("Rata-rata Kepercayaan", f"{avg_confidence:.0f}%")
     
     with col4:
-        high_confidence = len(forecast_data[forecast_data['confidence_level'] >= 0.7])
-        st.metric("Prediksi Tinggi", f"{high_confidence}")
+        st.metric("Prediksi Tinggi", f"{summary['high_conf']}")
     
     # Display items that need to be reordered soon
     st.subheader("Item yang Perlu Segera Dipesan")
     
-    reorder_soon = forecast_data[forecast_data['months_to_min_stock'] <= 3].copy()
+    m_reorder = forecast_data['months_to_min_stock'].to_numpy() <= 3
+    # Select just the displayed columns of the matching rows; nothing is
+    # reformatted, so no full copy of the frame is needed
+    reorder_soon = forecast_data.loc[m_reorder, ['item_name', 'category', 'current_stock', 'min_stock', 'unit', 
+                                                 'months_to_min_stock', 'reorder_date', 'recommended_order_qty']]
     
     if not reorder_soon.empty:
-        # Format the data for display
-        reorder_soon['annual_consumption_rate'] = (reorder_soon['annual_consumption_rate'] * 100).round(1).astype(str) + '%'
-        
         # Display as table
-        st.dataframe(
-            reorder_soon[['item_name', 'category', 'current_stock', 'min_stock', 'unit', 
-                         'months_to_min_stock', 'reorder_date', 'recommended_order_qty']]
-        )
+        st.dataframe(reorder_soon)
         
         # Visualization
-        fig = px.bar(
-            reorder_soon, 
+        fig = build_chart(
+            'bar',
+            reorder_soon[['item_name', 'months_to_min_stock']], 
             x='item_name', 
             y='months_to_min_stock',
             title='Bulan Hingga Mencapai Stok Minimum',
@@ -185,243 +452,49 @@ def app():
         st.warning("Tidak ada data forecast yang tersedia")
         return
     
-    # Clean and validate data
-    forecast_display = forecast_data.copy()
-    
-    # Handle NaN values and infinities
-    numeric_columns = ['annual_consumption_rate', 'projected_annual_consumption', 'confidence_level']
-    for col in numeric_columns:
-        forecast_display[col] = pd.to_numeric(forecast_display[col], errors='coerce')
-        forecast_display[col] = forecast_display[col].replace([np.inf, -np.inf], np.nan)
-        forecast_display[col] = forecast_display[col].fillna(0)
-    
-    # Format dates
-    if 'reorder_date' in forecast_display.columns:
-        forecast_display['reorder_date'] = pd.to_datetime(forecast_display['reorder_date'], errors='coerce')
-        forecast_display['reorder_date'] = forecast_display['reorder_date'].dt.strftime('%d/%m/%Y')
-    
-    # Convert rates to percentages (as floats, not strings)
-    forecast_display['annual_consumption_rate'] = (forecast_display['annual_consumption_rate'] * 100).round(1)
-    forecast_display['projected_annual_consumption'] = (forecast_display['projected_annual_consumption'] * 100).round(1)
-    forecast_display['confidence_level_pct'] = (forecast_display['confidence_level'] * 100).round(1)
-    
-    # Create display version with percentage strings
-    forecast_display['confidence_level_str'] = forecast_display['confidence_level_pct'].astype(str) + '%'
-    
-    # Color coding for confidence levels
-    def color_confidence(val):
-        try:
-            if isinstance(val, (int, float)):
-                confidence = val
-            elif isinstance(val, str) and val.endswith('%'):
-                confidence = float(val.replace('%', ''))
-            else:
-                return ''
-                
-            if confidence >= 80:
-                return 'background-color: #90EE90'  # Green
-            elif confidence >= 60:
-                return 'background-color: #FFFFE0'  # Yellow
-            elif confidence >= 40:
-                return 'background-color: #FFE4B5'  # Orange
-            else:
-                return 'background-color: #FFB6C1'  # Red
-        except (ValueError, TypeError):
-            return ''
-    
-    # Create display dataframe for styling
+    # Clean the percentage columns in one float64 buffer: map any infinities
+    # to 0 (the pipeline already converted missing and non-numeric values to
+    # 0), then convert rates to percentages (as floats, not strings)
+    pct = forecast_data[['annual_consumption_rate', 'projected_annual_consumption', 'confidence_level']].to_numpy(dtype=np.float64)
+    np.nan_to_num(pct, copy=False, nan=0.0, posinf=0.0, neginf=0.0)
+    pct *= 100
+    np.round(pct, 1, out=pct)
+    
+    # Assemble the display frame from only the columns it needs rather than
+    # copying forecast_data; untouched columns are shared, not duplicated
+    forecast_display = pd.DataFrame({
+        'item_name': forecast_data['item_name'],
+        'category': forecast_data['category'],
+        'current_stock': forecast_data['current_stock'],
+        'min_stock': forecast_data['min_stock'],
+        'annual_consumption_rate': pct[:, 0],
+        'projected_annual_consumption': pct[:, 1],
+        'months_to_min_stock': forecast_data['months_to_min_stock'],
+        'recommended_order_qty': forecast_data['recommended_order_qty'],
+        'reorder_date': forecast_data['reorder_date'],
+        'confidence_level_pct': pct[:, 2],
+        'forecast_method': forecast_data['forecast_method']
+    }, copy=False)
+    
+    # Create display dataframe
     display_cols = ['item_name', 'category', 'current_stock', 'min_stock', 'annual_consumption_rate', 
                    'projected_annual_consumption', 'months_to_min_stock', 'recommended_order_qty', 
-                   'reorder_date', 'confidence_level_str']
-    
-    # Only include columns that exist
-    available_cols = [col for col in display_cols if col in forecast_display.columns]
-    display_df = forecast_display[available_cols].copy()
+                   'reorder_date', 'confidence_level_pct']
     
-    styled_display = display_df.style.applymap(
-        color_confidence, 
-        subset=['confidence_level_str']
-    )
+    display_df = forecast_display[display_cols]
     
-    st.dataframe(styled_display, use_container_width=True)
+    # Only the selected view is built; st.tabs would build every tab on each rerun
+    views = ["Tabel Data", "Grafik Konsumsi", "Grafik Waktu Pemesanan", "Analisis Kualitas"]
+    active_view = st.radio("Tampilan", views, horizontal=True, key='forecast_active_view', label_visibility='collapsed')
     
-    # Add tabs for different views
-    tab1, tab2, tab3, tab4 = st.tabs(["Tabel Data", "Grafik Konsumsi", "Grafik Waktu Pemesanan", "Analisis Kualitas"])
-    
-    with tab1:
-        st.dataframe(display_df)
-        
-        # Export options
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if st.button("Ekspor ke CSV"):
-                csv = display_df.to_csv(index=False)
-                st.download_button(
-                    label="Download CSV",
-                    data=csv,
-                    file_name=f"inventory_forecast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.csv",
-                    mime="text/csv"
-                )
-        
-        with col2:
-            if st.button("Ekspor ke Excel"):
-                # Create Excel file in memory
-                output = io.BytesIO()
-                with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-                    display_df.to_excel(writer, sheet_name='Prediksi', index=False)
-                    
-                    # Get the workbook and add formats
-                    workbook = writer.book
-                    worksheet = writer.sheets['Prediksi']
-                    
-                    # Add header format
-                    header_format = workbook.add_format({
-                        'bold': True,
-                        'text_wrap': True,
-                        'valign': 'top',
-                        'bg_color': '#D7E4BC',
-                        'border': 1
-                    })
-                    
-                    # Write the column headers with the defined format
-                    for col_num, value in enumerate(display_df.columns.values):
-                        worksheet.write(0, col_num, value, header_format)
-                        
-                    # Adjust columns width
-                    worksheet.set_column(0, len(display_df.columns) - 1, 15)
-                
-                excel_data = output.getvalue()
-                
-                st.download_button(
-                    label="Download Excel",
-                    data=excel_data,
-                    file_name=f"inventory_forecast_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx",
-                    mime="application/vnd.ms-excel"
-                )
-    
-    with tab2:
-        # Sort by projected consumption
-        consumption_chart = forecast_display.sort_values('projected_annual_consumption', ascending=False).head(15)
-        
-        # Ensure data is clean and valid
-        consumption_chart = consumption_chart.dropna(subset=['projected_annual_consumption', 'item_name'])
-        if len(consumption_chart) > 0:
-            fig = px.bar(
-                consumption_chart, 
-                x='item_name', 
-                y='projected_annual_consumption',
-                title='15 Item dengan Proyeksi Konsumsi Tertinggi',
-                labels={'item_name': 'Nama Item', 'projected_annual_consumption': 'Proyeksi Konsumsi Tahunan (%)'},
-                color='category'
-            )
-            st.plotly_chart(fig, use_container_width=True)
-        else:
-            st.info("Tidak cukup data untuk menampilkan grafik proyeksi konsumsi")
-        
-        # Show consumption rate - handle potential empty data
-        rate_data = forecast_display.sort_values('annual_consumption_rate', ascending=False).head(15)
-        if len(rate_data) > 0:
-            # Ensure data is clean and valid
-            rate_data = rate_data.dropna(subset=['annual_consumption_rate', 'item_name'])
-            if len(rate_data) > 0:
-                fig2 = px.bar(
-                    rate_data, 
-                    x='item_name', 
-                    y='annual_consumption_rate',
-                    title='15 Item dengan Tingkat Konsumsi Tertinggi',
-                    labels={'item_name': 'Nama Item', 'annual_consumption_rate': 'Tingkat Konsumsi Tahunan (%)'},
-                    color='category'
-                )
-                st.plotly_chart(fig2, use_container_width=True)
-            else:
-                st.info("Tidak cukup data yang valid untuk menampilkan grafik")
-        else:
-            st.info("Tidak cukup data untuk menampilkan grafik tingkat konsumsi")
-    
-    with tab3:
-        # Sort by months to min stock
-        reorder_chart = forecast_display.sort_values('months_to_min_stock').head(15)
-        
-        # Ensure data is clean and valid
-        reorder_chart = reorder_chart.dropna(subset=['months_to_min_stock', 'item_name'])
-        if len(reorder_chart) > 0:
-            fig = px.bar(
-                reorder_chart, 
-                x='item_name', 
-                y='months_to_min_stock',
-                title='15 Item dengan Waktu Pemesanan Terdekat',
-                labels={'item_name': 'Nama Item', 'months_to_min_stock': 'Bulan Hingga Stok Minimum'},
-                color='months_to_min_stock',
-                color_continuous_scale='RdYlGn'
-            )
-            st.plotly_chart(fig, use_container_width=True)
-            
-            # Show recommended order quantities
-            fig2 = px.bar(
-                reorder_chart, 
-                x='item_name', 
-                y='recommended_order_qty',
-                title='Jumlah Pemesanan yang Direkomendasikan',
-                labels={'item_name': 'Nama Item', 'recommended_order_qty': 'Jumlah Pemesanan'},
-                color='category'
-            )
-            st.plotly_chart(fig2, use_container_width=True)
-        else:
-            st.info("Tidak cukup data untuk menampilkan grafik waktu pemesanan")
-    
-    with tab4:
-        st.subheader("Analisis Kualitas Prediksi")
-        
-        # Ensure we have the forecast_method column
-        if 'forecast_method' not in forecast_display.columns:
-            forecast_display['forecast_method'] = 'Seasonal Average'
-        
-        # Confidence level distribution
-        col1, col2 = st.columns(2)
-        
-        with col1:
-            if len(forecast_display) > 0:
-                confidence_dist = pd.cut(forecast_display['confidence_level_pct'], bins=5, labels=['Rendah', 'Cukup', 'Sedang', 'Tinggi', 'Sangat Tinggi'])
-                confidence_counts = confidence_dist.value_counts()
-                fig_conf = px.bar(
-                    x=confidence_counts.index,
-                    y=confidence_counts.values,
-                    title="Distribusi Tingkat Kepercayaan Prediksi",
-                    labels={'x': 'Tingkat Kepercayaan', 'y': 'Jumlah Item'}
-                )
-                st.plotly_chart(fig_conf, use_container_width=True)
-        
-        with col2:
-            method_counts = forecast_display['forecast_method'].value_counts()
-            if len(method_counts) > 0:
-                fig_method = px.pie(
-                    values=method_counts.values,
-                    names=method_counts.index,
-                    title="Metode Prediksi yang Digunakan"
-                )
-                st.plotly_chart(fig_method, use_container_width=True)
-        
-        # Show items with low confidence
-        low_confidence = forecast_display[forecast_display['confidence_level_pct'] < 50]
-        if len(low_confidence) > 0:
-            st.warning("⚠️ Item dengan Prediksi Rendah (< 50% kepercayaan)")
-            low_conf_cols = ['item_name', 'category', 'current_stock', 'months_to_min_stock', 'confidence_level_str', 'forecast_method']
-            low_conf_available = [col for col in low_conf_cols if col in low_confidence.columns]
-            low_conf_display = low_confidence[low_conf_available].copy()
-            st.dataframe(low_conf_display)
-        
-        # Show high confidence predictions
-        high_confidence = forecast_display[forecast_display['confidence_level_pct'] >= 80]
-        if len(high_confidence) > 0:
-            st.success("✅ Item dengan Prediksi Tinggi (≥ 80% kepercayaan)")
-            high_conf_cols = ['item_name', 'category', 'current_stock', 'months_to_min_stock', 'recommended_order_qty', 'confidence_level_str']
-            high_conf_available = [col for col in high_conf_cols if col in high_confidence.columns]
-            high_conf_display = high_confidence[high_conf_available].copy()
-            st.dataframe(high_conf_display)
-        
-        st.success("Data berhasil diperbarui!")
-        st.rerun()
+    if active_view == "Tabel Data":
+        show_data_table(display_df)
+    elif active_view == "Grafik Konsumsi":
+        show_consumption_charts(forecast_display)
+    elif active_view == "Grafik Waktu Pemesanan":
+        show_reorder_charts(forecast_display)
+    else:
+        show_quality_analysis(forecast_display)
 
 if __name__ == "__main__":
     app()
\ No newline at end of file
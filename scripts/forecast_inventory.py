@@ -3,7 +3,11 @@ import numpy as np
 from datetime import datetime, timedelta
 import os
 import sys
+import hashlib
 import warnings
+import xlsxwriter
+from pymongo import WriteConcern, ASCENDING, DESCENDING
+from bson import ObjectId
 from sklearn.linear_model import LinearRegression
 from sklearn.preprocessing import PolynomialFeatures
 import statsmodels.api as sm
@@ -11,8 +15,21 @@ import statsmodels.api as sm
 # Suppress warnings for cleaner output
 warnings.filterwarnings('ignore')
 
+# Project root and report output paths, resolved once at import
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORTS_DIR = os.path.join(ROOT, 'reports')
+DETAILED_REPORT = os.path.join(REPORTS_DIR, 'inventory_forecast_detailed.xlsx')
+SUMMARY_REPORT = os.path.join(REPORTS_DIR, 'inventory_forecast_summary.xlsx')
+
+# How long the monthly rollup is maintained incrementally before a full
+# rebuild, which is what picks up corrected issues
+ROLLUP_REBUILD_INTERVAL = timedelta(days=1)
+# Slack on insert times for clock skew between the workers stamping ids
+ROLLUP_ID_SLACK = timedelta(minutes=10)
+
 # Add parent directory to path to import utils
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.append(ROOT)
 from utils.database import MongoDBConnection
 
 def calculate_trend_forecast(historical_data, periods=12):
@@ -81,208 +98,237 @@ def calculate_exponential_smoothing_forecast(historical_data, alpha=0.3, periods
     except Exception:
         return None
 
-def run_forecast():
-    """Run optimized inventory forecasting analysis with multiple prediction methods"""
+def write_excel(df, path):
+    """Write a report with xlsxwriter, flushing each row to disk as it is written"""
+    # constant_memory only keeps the current row, so rows are written in
+    # order here; DataFrame.to_excel fills the sheet column by column
+    workbook = xlsxwriter.Workbook(path, {
+        'constant_memory': True,
+        'nan_inf_to_errors': True,
+        'default_date_format': 'yyyy-mm-dd hh:mm'
+    })
+    worksheet = workbook.add_worksheet()
+    worksheet.write_row(0, 0, df.columns, workbook.add_format({'bold': True}))
+    for row_num, row in enumerate(df.itertuples(index=False, name=None), start=1):
+        worksheet.write_row(row_num, 0, row)
+    workbook.close()
+
+def refresh_monthly_consumption(db, issue_count):
+    """Bring monthly_consumption up to date with the issue transactions, given
+    their current count"""
+    transactions_collection = db['inventory_transactions']
+    meta_collection = db['forecast_meta']
+    # ObjectId timestamps are UTC, so refresh times are kept in UTC as well
+    started_at = datetime.utcnow()
     
-    # Create directories for output
-    static_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static')
-    reports_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'reports')
+    state = meta_collection.find_one({'_id': 'monthly_consumption'}) or {}
+    group_stage = {'$group': {
+        '_id': {
+            'item_id': '$item_id',
+            'month': {'$dateFromParts': {
+                'year': {'$year': '$transaction_date'},
+                'month': {'$month': '$transaction_date'}
+            }}
+        },
+        'quantity': {'$sum': '$quantity'}
+    }}
     
-    os.makedirs(static_dir, exist_ok=True)
-    os.makedirs(reports_dir, exist_ok=True)
+    full_rebuild = (
+        state.get('rebuilt_at') is None
+        or started_at - state['rebuilt_at'] >= ROLLUP_REBUILD_INTERVAL
+        # Fewer issues than at the last refresh means some were deleted
+        or issue_count < state.get('issue_count', 0)
+    )
+    if full_rebuild:
+        # $out swaps the rebuilt two-year window in atomically and keeps the
+        # collection's indexes
+        window_start = (started_at - timedelta(days=730)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        transactions_collection.aggregate([
+            {'$match': {
+                'transaction_type': 'issue',
+                'transaction_date': {'$gte': window_start}
+            }},
+            group_stage,
+            {'$out': 'monthly_consumption'}
+        ])
+        update = {'refreshed_at': started_at, 'rebuilt_at': started_at, 'issue_count': issue_count}
+    else:
+        # Earliest month touched by issues inserted since the last refresh,
+        # whatever their transaction_date; the id says when each was inserted
+        inserted_since = ObjectId.from_datetime(state['refreshed_at'] - ROLLUP_ID_SLACK)
+        touched = next(transactions_collection.aggregate([
+            {'$match': {
+                '_id': {'$gte': inserted_since},
+                'transaction_type': 'issue',
+                'transaction_date': {'$type': 'date'}
+            }},
+            {'$group': {'_id': None, 'first_date': {'$min': '$transaction_date'}}}
+        ]), None)
+        if touched is not None:
+            window_start = touched['first_date'].replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+            # Whole month totals replace the stored ones, so repeated or
+            # overlapping refreshes converge instead of adding twice
+            transactions_collection.aggregate([
+                {'$match': {
+                    'transaction_type': 'issue',
+                    'transaction_date': {'$gte': window_start}
+                }},
+                group_stage,
+                {'$merge': {
+                    'into': 'monthly_consumption',
+                    'whenMatched': 'replace',
+                    'whenNotMatched': 'insert'
+                }}
+            ])
+        update = {'refreshed_at': started_at, 'issue_count': issue_count}
+    
+    # Record when this refresh began, not when it finished, so issues added
+    # while it ran fall inside the next one
+    meta_collection.update_one({'_id': 'monthly_consumption'}, {'$set': update}, upsert=True)
+
+def run_forecast():
+    """Run optimized inventory forecasting analysis with multiple prediction methods"""
     
     # Get database connection
-    db = MongoDBConnection()
+    db = MongoDBConnection.get_database()
     
     try:
         # Get all items with transaction history
         items_collection = db['items']
         transactions_collection = db['inventory_transactions']
+        meta_collection = db['forecast_meta']
+        item_fields = {'name': 1, 'category': 1, 'current_stock': 1, 'min_stock': 1, 'unit': 1}
         
-        # Get all items
-        items_data = list(items_collection.find({}))
-        
-        # Count transactions for each item
-        for item in items_data:
-            transaction_count = transactions_collection.count_documents({
-                'item_id': item['_id'],
-                'transaction_type': 'issue'
-            })
-            item['transaction_count'] = transaction_count
+        # Skip the run when neither items nor transactions changed since the
+        # last forecast made today; reorder dates move with the calendar.
+        # Only cheap indexed reads go into the fingerprint, so an unchanged
+        # run returns before any rollup write or join. Issues are appended,
+        # so their count changes with every new one whatever its id
+        issue_count = transactions_collection.count_documents({'transaction_type': 'issue'})
+        latest_issue = transactions_collection.find_one(
+            {'transaction_type': 'issue'}, {'_id': 0, 'transaction_date': 1}, sort=[('transaction_date', -1)]
+        )
+        item_rows = list(items_collection.find({}, item_fields).sort('_id', 1))
         
-        items_df = pd.DataFrame(items_data)
-        
-        if items_df.empty:
+        if not item_rows:
             print("No items found in database")
             return
         
-        if items_df.empty:
+        fingerprint = hashlib.sha1(repr((
+            datetime.now().date(),
+            issue_count,
+            latest_issue,
+            [(item['_id'], item.get('name'), item.get('category'), item.get('current_stock'),
+              item.get('min_stock'), item.get('unit')) for item in item_rows]
+        )).encode()).hexdigest()
+        state = meta_collection.find_one({'_id': 'forecast'}) or {}
+        if state.get('fingerprint') == fingerprint and db['inventory_forecast'].estimated_document_count() > 0:
+            print("Forecast is up to date, nothing to do")
+            return
+        
+        # Get all items joined with two years of monthly issue totals from
+        # the rollup, in one query
+        refresh_monthly_consumption(db, issue_count)
+        first_month = (datetime.now() - timedelta(days=730)).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        items_data = list(items_collection.aggregate([
+            {'$sort': {'_id': 1}},
+            {'$project': item_fields},
+            {'$lookup': {
+                'from': 'monthly_consumption',
+                'localField': '_id',
+                'foreignField': '_id.item_id',
+                'as': 'consumption'
+            }},
+            {'$addFields': {'consumption': {'$filter': {
+                'input': '$consumption',
+                'cond': {'$gte': ['$$this._id.month', first_month]}
+            }}}}
+        ]))
+        
+        if not items_data:
             print("No items found in database")
             return
         
-        # Get forecast collection
-        forecast_collection = db['inventory_forecast']
+        # Monthly consumption series per item, keyed by item id; months
+        # without issues count as zero consumption
+        monthly_by_item = {
+            item['_id']: pd.Series(
+                [row['quantity'] for row in item['consumption']],
+                index=pd.DatetimeIndex([row['_id']['month'] for row in item['consumption']]) + pd.offsets.MonthEnd(0)
+            ).sort_index().asfreq('M', fill_value=0)
+            for item in items_data if item['consumption']
+        }
         
-        # Clear old forecast data
-        forecast_collection.delete_many({})
+        items_df = pd.DataFrame(items_data).drop(columns='consumption')
+        # Missing stock fields count as zero; NaN would otherwise reach the
+        # int64 casts below and turn into nonsense order quantities
+        stock_columns = ['current_stock', 'min_stock']
+        items_df[stock_columns] = items_df.reindex(columns=stock_columns).fillna(0)
         
         # Process each item with optimized forecasting
-        forecast_results = []
+        projections = []
+        confidences = []
+        methods_used = []
         processed_count = 0
         
-        for _, item in items_df.iterrows():
-            item_id = item['id']
-            item_name = item['name']
-            current_stock = item['current_stock']
-            min_stock = item['min_stock']
-            unit = item['unit']
-            transaction_count = item['transaction_count']
+        for item_id, min_stock in zip(items_df['_id'], items_df['min_stock'].tolist()):
+            monthly_consumption = monthly_by_item.get(item_id)
             
-            # Skip items with no transaction history
-            if transaction_count == 0:
+            # Skip items with no recent transaction history
+            if monthly_consumption is None:
                 # Use minimum stock as baseline for new items
                 projected_annual = max(min_stock * 2, 10)  # Default for new items
                 forecast_method = "minimum_baseline"
                 confidence_level = 0.3
             else:
-                # Get detailed consumption history
-                two_years_ago = datetime.now() - timedelta(days=730)
+                # Calculate actual annual consumption
+                annual_consumption = monthly_consumption.sum()
                 
-                # Get consumption data from MongoDB
-                consumption_data = list(transactions_collection.find({
-                    'item_id': item_id,
-                    'transaction_type': 'issue',
-                    'transaction_date': {'$gte': two_years_ago}
-                }, {'transaction_date': 1, 'quantity': 1}).sort('transaction_date', 1))
+                # Apply multiple forecasting methods
+                methods = []
                 
-                consumption_data = pd.DataFrame(consumption_data)
+                # Method 1: Linear trend
+                trend_forecast = calculate_trend_forecast(monthly_consumption)
+                if trend_forecast:
+                    methods.append(('trend', trend_forecast))
                 
-                if consumption_data.empty:
-                    projected_annual = max(min_stock * 2, 10)
-                    forecast_method = "minimum_baseline"
-                    confidence_level = 0.3
-                else:
-                    # Create monthly consumption series
-                    consumption_data['transaction_date'] = pd.to_datetime(consumption_data['transaction_date'])
-                    monthly_consumption = consumption_data.groupby(
-                        pd.Grouper(key='transaction_date', freq='M')
-                    )['quantity'].sum().fillna(0)
-                    
-                    # Calculate actual annual consumption
-                    annual_consumption = monthly_consumption.sum()
-                    
-                    # Apply multiple forecasting methods
-                    methods = []
-                    
-                    # Method 1: Linear trend
-                    trend_forecast = calculate_trend_forecast(monthly_consumption)
-                    if trend_forecast:
-                        methods.append(('trend', trend_forecast))
-                    
-                    # Method 2: Seasonal pattern
-                    seasonal_forecast = calculate_seasonal_forecast(monthly_consumption)
-                    if seasonal_forecast:
-                        methods.append(('seasonal', seasonal_forecast))
-                    
-                    # Method 3: Exponential smoothing
-                    exp_smooth_forecast = calculate_exponential_smoothing_forecast(monthly_consumption)
-                    if exp_smooth_forecast:
-                        methods.append(('exponential', exp_smooth_forecast))
-                    
-                    # Method 4: Simple average (fallback)
-                    avg_monthly = monthly_consumption.mean()
-                    avg_forecast = avg_monthly * 12 * 1.1  # 10% growth buffer
-                    methods.append(('average', avg_forecast))
-                    
-                    # Select best method based on data quality
-                    if len(monthly_consumption) >= 24:
-                        # Use weighted combination for longer history
-                        weights = [0.4, 0.3, 0.2, 0.1]  # Trend gets highest weight
-                        weighted_forecast = sum(w * f for (_, f), w in zip(methods, weights))
-                        projected_annual = weighted_forecast
-                        forecast_method = "weighted_combination"
-                        confidence_level = 0.85
-                    elif len(monthly_consumption) >= 12:
-                        # Use seasonal for 1+ year data
-                        projected_annual = seasonal_forecast or avg_forecast
-                        forecast_method = "seasonal_average"
-                        confidence_level = 0.75
-                    else:
-                        # Use simple average for limited data
-                        projected_annual = avg_forecast
-                        forecast_method = "simple_average"
-                        confidence_level = 0.6
-            
-            # Calculate consumption rate
-            if current_stock > 0:
-                annual_consumption_rate = projected_annual / max(current_stock, 1)
-            else:
-                annual_consumption_rate = 0
-            
-            # Monthly projected consumption
-            monthly_projected = projected_annual / 12
-            
-            # Calculate months until minimum stock
-            if monthly_projected > 0:
-                months_to_min = max((current_stock - min_stock) / monthly_projected, 0)
-            else:
-                months_to_min = 999
-            
-            # Calculate reorder date with buffer
-            if months_to_min <= 12:
-                # Add safety buffer based on confidence level
-                buffer_days = max(7, int((1 - confidence_level) * 30))
-                reorder_date = datetime.now() + timedelta(days=int(months_to_min * 30) + buffer_days)
-            else:
-                reorder_date = None
-            
-            # Calculate recommended order quantity with optimization
-            if months_to_min <= 6:  # Extended reorder window
-                # Base calculation
-                base_qty = int(projected_annual * (6 - months_to_min) / 12)
+                # Method 2: Seasonal pattern
+                seasonal_forecast = calculate_seasonal_forecast(monthly_consumption)
+                if seasonal_forecast:
+                    methods.append(('seasonal', seasonal_forecast))
                 
-                # Adjust based on current stock vs min stock
-                stock_adjustment = max(min_stock - current_stock, 0)
+                # Method 3: Exponential smoothing
+                exp_smooth_forecast = calculate_exponential_smoothing_forecast(monthly_consumption)
+                if exp_smooth_forecast:
+                    methods.append(('exponential', exp_smooth_forecast))
                 
-                # Economic order quantity consideration
-                if monthly_projected > 0:
-                    # EOQ = sqrt(2 * D * S / H) where D=demand, S=ordering cost, H=holding cost
-                    # Simplified EOQ with estimated values
-                    eoq = int(np.sqrt(2 * projected_annual * 50 / (projected_annual * 0.2)))
-                    optimal_qty = max(base_qty, stock_adjustment, eoq)
-                else:
-                    optimal_qty = max(base_qty, stock_adjustment)
+                # Method 4: Simple average (fallback)
+                avg_monthly = monthly_consumption.mean()
+                avg_forecast = avg_monthly * 12 * 1.1  # 10% growth buffer
+                methods.append(('average', avg_forecast))
                 
-                recommended_qty = max(optimal_qty, min_stock)
-            else:
-                recommended_qty = 0
-            
-            # Ensure recommended quantity is reasonable
-            if recommended_qty > 0:
-                recommended_qty = max(recommended_qty, min_stock)
-                if current_stock > 0:
-                    recommended_qty = min(recommended_qty, current_stock * 3)  # Cap at 3x current stock
-            
-            # Store result with enhanced metadata
-            forecast_result = {
-                'item_id': item_id,
-                'item_name': item_name,
-                'category': item['category'],
-                'current_stock': current_stock,
-                'min_stock': min_stock,
-                'unit': unit,
-                'annual_consumption_rate': annual_consumption_rate,
-                'projected_annual_consumption': projected_annual,
-                'monthly_projected_consumption': monthly_projected,
-                'months_to_min_stock': months_to_min,
-                'reorder_date': reorder_date,
-                'recommended_order_qty': recommended_qty,
-                'confidence_level': confidence_level,
-                'forecast_method': forecast_method,
-                'forecast_date': datetime.now()
-            }
-            
-            forecast_results.append(forecast_result)
+                # Select best method based on data quality
+                if len(monthly_consumption) >= 24:
+                    # Use weighted combination for longer history
+                    weights = [0.4, 0.3, 0.2, 0.1]  # Trend gets highest weight
+                    weighted_forecast = sum(w * f for (_, f), w in zip(methods, weights))
+                    projected_annual = weighted_forecast
+                    forecast_method = "weighted_combination"
+                    confidence_level = 0.85
+                elif len(monthly_consumption) >= 12:
+                    # Use seasonal for 1+ year data
+                    projected_annual = seasonal_forecast or avg_forecast
+                    forecast_method = "seasonal_average"
+                    confidence_level = 0.75
+                else:
+                    # Use simple average for limited data
+                    projected_annual = avg_forecast
+                    forecast_method = "simple_average"
+                    confidence_level = 0.6
+        
+            projections.append(projected_annual)
+            confidences.append(confidence_level)
+            methods_used.append(forecast_method)
             
             processed_count += 1
             
@@ -290,13 +336,108 @@ def run_forecast():
             if processed_count % 10 == 0:
                 print(f"Processed {processed_count} items...")
         
-        # Insert all forecast results into MongoDB
+        # Stock arithmetic runs on whole columns once the per-item models are done
+        projected_annual = np.asarray(projections, dtype=np.float64)
+        confidence_level = np.asarray(confidences, dtype=np.float64)
+        current_stock = items_df['current_stock'].to_numpy(dtype=np.float64)
+        min_stock = items_df['min_stock'].to_numpy(dtype=np.float64)
+        
+        # Calculate consumption rate
+        annual_consumption_rate = np.where(current_stock > 0, projected_annual / np.maximum(current_stock, 1), 0.0)
+        
+        # Monthly projected consumption
+        monthly_projected = projected_annual / 12
+        has_demand = monthly_projected > 0
+        safe_monthly = np.where(has_demand, monthly_projected, 1.0)
+        
+        # Calculate months until minimum stock
+        months_to_min = np.where(has_demand, np.maximum((current_stock - min_stock) / safe_monthly, 0), 999.0)
+        
+        # Calculate reorder date with buffer based on confidence level
+        buffer_days = np.maximum(7, np.trunc((1 - confidence_level) * 30))
+        reorder_days = np.trunc(months_to_min * 30) + buffer_days
+        # Only dates within 12 months are kept, so longer offsets are zeroed
+        # before they can overflow the timedelta range
+        has_reorder = months_to_min <= 12
+        reorder_dates = np.datetime64(datetime.now(), 'us') + np.where(has_reorder, reorder_days, 0).astype(np.int64).astype('timedelta64[D]')
+        reorder_dates[~has_reorder] = np.datetime64('NaT')
+        # Microsecond datetimes convert to datetime objects, and NaT to None
+        reorder_dates = reorder_dates.astype(object)
+        
+        # Calculate recommended order quantity within the extended reorder
+        # window, in int64 throughout; astype truncates toward zero like int()
+        in_window = months_to_min <= 6
+        stock_qty = current_stock.astype(np.int64)
+        min_qty = min_stock.astype(np.int64)
+        base_qty = np.where(in_window, projected_annual * (6 - months_to_min) / 12, 0).astype(np.int64)
+        stock_adjustment = np.maximum(min_qty - stock_qty, 0)
+        # Simplified EOQ = sqrt(2 * D * S / H) with S = 50 and H = 0.2 * D; demand
+        # cancels out, so it is one constant for every item with demand
+        eoq = np.where(has_demand, int(np.sqrt(2 * 50 / 0.2)), 0)
+        optimal_qty = np.maximum(np.maximum(base_qty, stock_adjustment), eoq)
+        recommended_qty = np.where(in_window, np.maximum(optimal_qty, min_qty), 0)
+        
+        # Ensure recommended quantity is reasonable, capped at 3x current stock
+        capped_qty = np.where(stock_qty > 0, np.minimum(recommended_qty, stock_qty * 3), recommended_qty)
+        recommended_qty = np.where(recommended_qty > 0, capped_qty, 0)
+        
+        # Store results with enhanced metadata, stamped with one run date;
+        # columns come straight from the arrays instead of per-row dicts
+        forecast_df = pd.DataFrame({
+            'item_id': items_df['_id'].to_numpy(),
+            'item_name': items_df['name'].to_numpy(),
+            'category': items_df['category'].to_numpy(),
+            'current_stock': items_df['current_stock'].to_numpy(),
+            'min_stock': items_df['min_stock'].to_numpy(),
+            'unit': items_df['unit'].to_numpy(),
+            'annual_consumption_rate': annual_consumption_rate,
+            'projected_annual_consumption': projected_annual,
+            'monthly_projected_consumption': monthly_projected,
+            'months_to_min_stock': months_to_min,
+            # An explicit object Series keeps pandas from inferring datetime64,
+            # which would turn None into NaT that BSON cannot encode
+            'reorder_date': pd.Series(reorder_dates, dtype=object),
+            'recommended_order_qty': recommended_qty,
+            'confidence_level': confidence_level,
+            'forecast_method': np.array(methods_used, dtype=object),
+            'forecast_date': datetime.now()
+        }, copy=False)
+        forecast_results = forecast_df.to_dict('records')
+        
+        # Build the new forecast in a staging collection and rename it over
+        # the old one, so readers switch runs at once and never see a
+        # half-written or emptied collection
         if forecast_results:
-            forecast_collection.insert_many(forecast_results)
+            # The forecast can be rebuilt from scratch by any run, so its bulk
+            # writes only wait for the primary instead of a journaled majority
+            forecast_write_concern = WriteConcern(w=1, j=False)
+            # Each run stages under its own name, so concurrent runs cannot
+            # drop or rename each other's half-written collection
+            staging_collection = db.get_collection(
+                f'inventory_forecast_staging_{ObjectId()}', write_concern=forecast_write_concern
+            )
+            try:
+                # Unordered inserts let the server apply each batch without
+                # stopping at the first document
+                staging_collection.insert_many(forecast_results, ordered=False)
+                # Same index as MongoDBConnection._create_indexes, since the
+                # rename replaces the old collection together with its indexes
+                staging_collection.create_index([("forecast_date", DESCENDING), ("months_to_min_stock", ASCENDING)])
+                staging_collection.rename('inventory_forecast', dropTarget=True)
+            except Exception:
+                # The live forecast is untouched; only this run's staging goes
+                staging_collection.drop()
+                raise
             print(f"Successfully inserted {len(forecast_results)} forecast records")
-        
-        # Create DataFrame for analysis
-        forecast_df = pd.DataFrame(forecast_results)
+            
+            # The fingerprint describes the forecast just written, so it is
+            # written under the same concern and is no more durable than it;
+            # losing both only means the next run rebuilds the forecast
+            meta_collection.with_options(write_concern=forecast_write_concern).update_one(
+                {'_id': 'forecast'},
+                {'$set': {'fingerprint': fingerprint, 'updated_at': datetime.now()}},
+                upsert=True
+            )
         
         if not forecast_df.empty:
             # Generate comprehensive summary
@@ -311,18 +452,18 @@ def run_forecast():
             urgent_items = forecast_df[forecast_df['months_to_min_stock'] <= 2]
             if not urgent_items.empty:
                 print(f"\n🚨 URGENT REORDER NEEDED (≤ 2 months): {len(urgent_items)} items")
-                for _, item in urgent_items.iterrows():
-                    print(f"   • {item['item_name']}: {item['months_to_min_stock']:.1f} months, "
-                          f"order {item['recommended_order_qty']} {item['unit']} "
-                          f"(confidence: {item['confidence_level']:.0%})")
+                for item in urgent_items.itertuples(index=False):
+                    print(f"   • {item.item_name}: {item.months_to_min_stock:.1f} months, "
+                          f"order {item.recommended_order_qty} {item.unit} "
+                          f"(confidence: {item.confidence_level:.0%})")
             
             # Medium priority items
             medium_items = forecast_df[(forecast_df['months_to_min_stock'] > 2) & 
                                      (forecast_df['months_to_min_stock'] <= 6)]
             if not medium_items.empty:
                 print(f"\n⚠️  MEDIUM PRIORITY (2-6 months): {len(medium_items)} items")
-                for _, item in medium_items.head(5).iterrows():
-                    print(f"   • {item['item_name']}: {item['months_to_min_stock']:.1f} months")
+                for item in medium_items.head(5).itertuples(index=False):
+                    print(f"   • {item.item_name}: {item.months_to_min_stock:.1f} months")
             
             # Category analysis
             print(f"\n📊 FORECASTING METHODS USED:")
@@ -330,30 +471,30 @@ def run_forecast():
             for method, count in method_counts.items():
                 print(f"   • {method.replace('_', ' ').title()}: {count} items")
             
+            # Create the output directory only when a report is written
+            if not os.path.isdir(REPORTS_DIR):
+                # exist_ok covers a concurrent run creating it in between
+                os.makedirs(REPORTS_DIR, exist_ok=True)
+            
             # Export detailed results
-            forecast_df.to_excel(os.path.join(reports_dir, 'inventory_forecast_detailed.xlsx'), 
-                               index=False)
+            write_excel(forecast_df.assign(item_id=forecast_df['item_id'].astype(str)), DETAILED_REPORT)
             
             # Create simplified summary
             summary_df = forecast_df[['item_name', 'category', 'current_stock', 'min_stock', 
                                     'months_to_min_stock', 'recommended_order_qty', 
                                     'confidence_level', 'forecast_method']]
-            summary_df.to_excel(os.path.join(reports_dir, 'inventory_forecast_summary.xlsx'), 
-                              index=False)
+            write_excel(summary_df, SUMMARY_REPORT)
             
             print(f"\n✅ Forecasting completed successfully!")
-            print(f"   Detailed report: {os.path.join(reports_dir, 'inventory_forecast_detailed.xlsx')}")
-            print(f"   Summary report: {os.path.join(reports_dir, 'inventory_forecast_summary.xlsx')}")
+            print(f"   Detailed report: {DETAILED_REPORT}")
+            print(f"   Summary report: {SUMMARY_REPORT}")
             
         else:
             print("❌ No forecast data generated")
             
     except Exception as e:
         print(f"❌ Error during forecasting: {str(e)}")
-        conn.rollback()
         raise
-    finally:
-        conn.close()
 
 if __name__ == "__main__":
     run_forecast()
\ No newline at end of file
@@ -379,7 +379,8 @@ class InventoryAnalytics:
                 daily_df = daily_df.fillna(0)
                 
                 # Line chart
-                fig = px.line(daily_df, title='Tren Pergerakan Harian')
+                # WebGL keeps long daily series responsive in the browser
+                fig = px.line(daily_df, title='Tren Pergerakan Harian', render_mode='webgl')
                 st.plotly_chart(fig)
         else:
             st.info("Tidak cukup data untuk analisis pergerakan")
@@ -408,7 +409,7 @@ class InventoryAnalytics:
             # Consumption vs Receipt chart
             fig = px.scatter(df, x='total_received', y='total_consumed', 
                            title='Konsumsi vs Penerimaan Departemen',
-                           hover_data=['total_consumed', 'total_received'])
+                           render_mode='webgl')
             st.plotly_chart(fig)
         else:
             st.info("Tidak cukup data untuk analisis departemen")
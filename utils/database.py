@@ -10,6 +10,7 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from config import MONGODB_SETTINGS, REALTIME_SETTINGS
 import json
+import threading
 from bson import ObjectId
 
 # Configure logging
@@ -21,11 +22,20 @@ class MongoDBConnection:
     
     _client = None
     _database = None
+    # Streamlit runs each session's script in its own thread; the lock keeps
+    # concurrent first calls from building more than one client and pool
+    _lock = threading.RLock()
     
     @classmethod
     def get_client(cls):
         """Get MongoDB client with connection pooling"""
-        if cls._client is None:
+        if cls._client is not None:
+            return cls._client
+        
+        with cls._lock:
+            if cls._client is not None:
+                return cls._client
+            
             try:
                 # Build connection string
                 if MONGODB_SETTINGS['username'] and MONGODB_SETTINGS['password']:
@@ -34,7 +44,7 @@ class MongoDBConnection:
                     connection_string = f"mongodb://{MONGODB_SETTINGS['host']}:{MONGODB_SETTINGS['port']}"
                 
                 # Create client with connection pooling
-                cls._client = MongoClient(
+                client = MongoClient(
                     connection_string,
                     maxPoolSize=MONGODB_SETTINGS['maxPoolSize'],
                     minPoolSize=MONGODB_SETTINGS['minPoolSize'],
@@ -46,8 +56,9 @@ class MongoDBConnection:
                     retryReads=True
                 )
                 
-                # Test connection
-                cls._client.admin.command('ping')
+                # Test connection before publishing the client to other threads
+                client.admin.command('ping')
+                cls._client = client
                 logger.info("MongoDB connection established successfully")
                 
             except ConnectionFailure as e:
@@ -59,12 +70,17 @@ class MongoDBConnection:
     @classmethod
     def get_database(cls):
         """Get database instance"""
-        if cls._database is None:
-            client = cls.get_client()
-            cls._database = client[MONGODB_SETTINGS['database']]
-            
-            # Create indexes for better performance
-            cls._create_indexes(cls._database)
+        if cls._database is not None:
+            return cls._database
+        
+        with cls._lock:
+            if cls._database is None:
+                client = cls.get_client()
+                database = client[MONGODB_SETTINGS['database']]
+                
+                # Create indexes for better performance
+                cls._create_indexes(database)
+                cls._database = database
             
         return cls._database
     
@@ -88,12 +104,25 @@ class MongoDBConnection:
             db.inventory_transactions.create_index([("transaction_type", ASCENDING)])
             db.inventory_transactions.create_index([("transaction_date", DESCENDING)])
             db.inventory_transactions.create_index([("created_by", ASCENDING)])
+            # Covers the forecast consumption pipeline (type + date range, then item/quantity)
+            db.inventory_transactions.create_index([
+                ("transaction_type", ASCENDING),
+                ("transaction_date", ASCENDING),
+                ("item_id", ASCENDING),
+                ("quantity", ASCENDING)
+            ])
             
             # Requests collection indexes
             db.item_requests.create_index([("status", ASCENDING)])
             db.item_requests.create_index([("request_date", DESCENDING)])
             db.item_requests.create_index([("department_id", ASCENDING)])
             
+            # Monthly consumption rollup, joined to items by the forecast script
+            db.monthly_consumption.create_index([("_id.item_id", ASCENDING), ("_id.month", ASCENDING)])
+            
+            # Forecast collection indexes (latest-run lookup, rows in reorder order)
+            db.inventory_forecast.create_index([("forecast_date", DESCENDING), ("months_to_min_stock", ASCENDING)])
+            
             logger.info("Database indexes created successfully")
             
         except Exception as e: